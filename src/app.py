@@ -1,11 +1,16 @@
 import gradio as gr
 import os
 import asyncio
+import hashlib
 import openai
 
-from utils import combine_documents, convert_llamaindex_messages_to_gradio
-from pdf2image import convert_from_path
-from llama_index.core import SimpleDirectoryReader
+from utils import (
+    SingleFlight,
+    compute_file_digest,
+    load_document_text,
+    load_document_images,
+    convert_llamaindex_messages_to_gradio
+)
 from llama_index.llms.openai import OpenAI
 from llama_index.core.prompts import ChatMessage, MessageRole
 
@@ -14,7 +19,7 @@ from tools.jd_extractor import (
     extract_job_description_from_url
 )
 from tools.content_analyst import acritique_cv_content
-from tools.layout_analyst import acritique_cv_layout
+from tools.layout_analyst import acritique_cv_layout, acritique_cv_layout_by_page
 from tools.editor import edit_cv
 
 def _resolve_openai_model():
@@ -34,6 +39,15 @@ CHATBOT_SYSTEM_PROMPT = (
     "If the AI does not know the answer, it will say 'I don't know' and will not make up information."
     )
 
+INGESTION_CONCURRENCY_LIMIT = 2
+ANALYSIS_CONCURRENCY_LIMIT = 4
+
+ANALYSIS_FLIGHT = SingleFlight()
+
+def _llm_identity(llm):
+    api_key = getattr(llm, "api_key", None) or ""
+    return (llm.model, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+
 with gr.Blocks(title="main") as demo:
 
     with gr.Column(visible=True) as login_block:
@@ -84,12 +98,10 @@ with gr.Blocks(title="main") as demo:
 
         ## Events
         ### Upload JD Events
-        @jd_upload_button.upload(inputs=[jd_upload_button, state], outputs=jd_output_upload)
+        @jd_upload_button.upload(inputs=[jd_upload_button, state], outputs=jd_output_upload, concurrency_limit=INGESTION_CONCURRENCY_LIMIT, concurrency_id="ingestion")
         def upload_jd_file(jd_path, current_state):
             try:
-                jd_data = combine_documents(
-                    SimpleDirectoryReader(input_files = [jd_path]).load_data()
-                    )
+                jd_data = load_document_text(jd_path)
                 current_state["jd_data"] = jd_data
                 return {jd_output_upload: jd_data}
             except:
@@ -150,19 +162,20 @@ with gr.Blocks(title="main") as demo:
                 }
         
         ### Upload CV Events
-        @cv_input.upload(inputs=[cv_input, state], outputs=[cv_images, cv_markdown])
+        @cv_input.upload(inputs=[cv_input, state], outputs=[cv_images, cv_markdown], concurrency_limit=INGESTION_CONCURRENCY_LIMIT, concurrency_id="ingestion")
         def upload_cv(file_path, current_state):
-            converted_images = convert_from_path(file_path, dpi=300)
-            cv_data = combine_documents(
-                SimpleDirectoryReader(input_files = [file_path]).load_data()
-                )
+            cv_digest = compute_file_digest(file_path)
+            converted_images = load_document_images(file_path, dpi=300, file_digest=cv_digest)
+            cv_data = load_document_text(file_path, file_digest=cv_digest)
             filename = os.path.basename(file_path)
+            current_state["cv_digest"] = cv_digest
             current_state["cv_data"] = cv_data
             current_state["cv_images"] = converted_images # List of PIL.Image
             return {cv_images: converted_images, cv_markdown: filename}
 
         @cv_input.clear(inputs=state, outputs=[cv_images, cv_markdown])
         def remove_cv(current_state):
+            current_state["cv_digest"] = ""
             current_state["cv_data"] = ""
             current_state["cv_images"] = []
             return {cv_images: [], cv_markdown: "Please Upload your Resume to begin"}
@@ -180,6 +193,7 @@ with gr.Blocks(title="main") as demo:
             
             with gr.Row():
                 analysis_button = gr.Button("Analyze resume", size="sm")
+                per_page_layout = gr.Checkbox(label="Per-page layout analysis", value=False)
             
             with gr.Row():
                 content_analysis = gr.Markdown(label="Content Analysis")
@@ -223,56 +237,70 @@ with gr.Blocks(title="main") as demo:
                 current_state["chat_messages"] = []
             return {chatbot: None}
 
-        @analysis_button.click(inputs=[state, llm_state], outputs=[content_analysis, layout_analysis, chatbot])
-        def analyze_resume(current_state, llm_state):
+        @analysis_button.click(inputs=[state, llm_state, per_page_layout], outputs=[content_analysis, layout_analysis, chatbot], concurrency_limit=ANALYSIS_CONCURRENCY_LIMIT)
+        def analyze_resume(current_state, llm_state, per_page):
             cv_data = current_state.get("cv_data", "")
             cv_images = current_state.get("cv_images", [])
             jd = current_state.get("jd_data", "")
             messages = current_state["chat_messages"]
-            user_message = "Please help to analyze my resume."
-            messages.append(ChatMessage(role=MessageRole.USER, content=user_message))
+            user_message = ChatMessage(role=MessageRole.USER, content="Please help to analyze my resume.")
             
             if not cv_data or not cv_images:
                 ai_message = "Resume not found. Please upload the resume first before I can perform analysis."
-                messages.append(ChatMessage(role=MessageRole.ASSISTANT, content=ai_message))
+                messages.extend([user_message, ChatMessage(role=MessageRole.ASSISTANT, content=ai_message)])
                 current_state["chat_messages"] = messages
                 gradio_messages = convert_llamaindex_messages_to_gradio(messages)
                 return {content_analysis: "", layout_analysis: "", chatbot: gradio_messages}
             
             else:
-                if jd:
-                    tasks = [
-                        acritique_cv_content(
-                            resume=cv_data,
-                            job_description=jd,
-                            llm=llm_state["content_critique"]
-                            ),
-                        acritique_cv_layout(
-                            resume = cv_images,
-                            job_description = jd,
-                            llm=llm_state["visual_critique"]
-                            )
-                        ]
+                critique_layout = acritique_cv_layout_by_page if per_page else acritique_cv_layout
+
+                def run_analysis():
+                    if jd:
+                        tasks = [
+                            acritique_cv_content(
+                                resume=cv_data,
+                                job_description=jd,
+                                llm=llm_state["content_critique"]
+                                ),
+                            critique_layout(
+                                resume = cv_images,
+                                job_description = jd,
+                                llm=llm_state["visual_critique"]
+                                )
+                            ]
                     
-                else:
-                    tasks = [
-                        acritique_cv_content(
-                            resume=cv_data,
-                            llm=llm_state["content_critique"]
-                            ),
-                        acritique_cv_layout(
-                            resume = cv_images,
-                            llm=llm_state["visual_critique"]
-                            )
-                        ]
+                    else:
+                        tasks = [
+                            acritique_cv_content(
+                                resume=cv_data,
+                                llm=llm_state["content_critique"]
+                                ),
+                            critique_layout(
+                                resume = cv_images,
+                                llm=llm_state["visual_critique"]
+                                )
+                            ]
                 
-                async def collect_critique(tasks):
-                    return await asyncio.gather(*tasks)
+                    async def collect_critique(tasks):
+                        return await asyncio.gather(*tasks)
                 
-                content_analysis_response, layout_analysis_response = asyncio.run(collect_critique(tasks))
+                    return asyncio.run(collect_critique(tasks))
+
+                # Identical analyses submitted concurrently with the same API key and models
+                # (e.g. from multiple tabs) share one run. Different API keys never share a run.
+                analysis_key = (
+                    current_state.get("cv_digest") or cv_data,
+                    jd,
+                    per_page,
+                    _llm_identity(llm_state["content_critique"]),
+                    _llm_identity(llm_state["visual_critique"])
+                    )
+                content_analysis_response, layout_analysis_response = ANALYSIS_FLIGHT.do(analysis_key, run_analysis)
                 
                 overall_analysis = f"# Content Analysis\n{content_analysis_response}\n\n\n # Layout Analysis\n{layout_analysis_response}\n"
-                messages.append(ChatMessage(role=MessageRole.ASSISTANT, content=overall_analysis))
+                # Append the user/assistant pair together so concurrent clicks never interleave the history
+                messages.extend([user_message, ChatMessage(role=MessageRole.ASSISTANT, content=overall_analysis)])
                 current_state["chat_messages"] = messages
                 current_state["overall_analysis"] = overall_analysis
                 gradio_messages = convert_llamaindex_messages_to_gradio(messages)
@@ -1,6 +1,10 @@
 import io
 import base64
-from typing import Optional
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
 from llama_index.core.schema import ImageDocument
 from llama_index.core.llms import LLM
 from llama_index.core.prompts import ChatMessage, MessageRole
@@ -35,6 +39,44 @@ Short Sentences: Keep sentences concise to improve readability.
 Be specific in your feedback. If possible, suggest actionable improvements, only if the improvements have not been done by the original resume.
 """
 
+CV_PAGE_LAYOUT_CRITIQUE_SYSTEM_PROMPT = """You are an honest and reliable HR specialist with expertise in building effective resumes.
+You are not afraid to constructively comment on the weak aspects of the resume. Be honest, do not make up information.
+You will be given a single page of a resume and optionally a job description. Your task is to critique the aesthetic aspects of this page by focusing on the following:
+
+1. Layout and Structure: Clarity and organization of sections, white space, alignment and margins.
+
+2. Font choice, size and consistency: Professional, easy-to-read fonts and appropriate font sizes. Bold, italics and spacing used to guide the reader's eye to the most important information.
+
+3. Color Scheme: Choice of color for texts, highlights, headings, etc.
+
+4. Visual Elements: The usage appropriateness of icons or graphics. Design suitability for the job description and professionalism.
+
+5. Consistency: Consistent formatting for dates, locations, and bullet points within the page.
+
+6. Scannability: Use of bullet points and concise sentences.
+
+Only critique what is visible on this page. Do not comment on the overall length of the resume or on page breaks, these are reviewed separately.
+Be specific in your feedback. If possible, suggest actionable improvements, only if the improvements have not been done by the original resume.
+"""
+
+CV_LENGTH_LAYOUT_CRITIQUE_SYSTEM_PROMPT = """You are an honest and reliable HR specialist with expertise in building effective resumes.
+You will be given all pages of a resume and optionally a job description. The design of each individual page has already been reviewed.
+Your task is to briefly critique only the following aspects:
+
+1. Length: Whether the resume's length is appropriate.{multi_page_criteria}
+
+Keep your feedback short and specific.
+"""
+
+CV_MULTI_PAGE_CRITERIA = """
+2. Page Breaks: Are page breaks clean between sections, without splitting information awkwardly across pages.
+3. Consistency across pages: Whether dates, locations, headings and bullet points are formatted consistently from one page to the next."""
+
+MAX_LAYOUT_CACHE_SIZE = 256
+
+_LAYOUT_CRITIQUE_CACHE = OrderedDict()
+_LAYOUT_CRITIQUE_CACHE_LOCK = threading.Lock()
+
 def convert_PIL_to_base64(image) -> str:
     buffer = io.BytesIO()
     image.save(buffer, format="PNG")
@@ -43,35 +85,73 @@ def convert_PIL_to_base64(image) -> str:
     
     return base64_image
 
-def critique_cv_layout(
-    resume,
-    llm: LLM,
-    job_description: Optional[str] = None,
-):
-    if not isinstance(resume, list):
-        resume = [resume]
-    
-    image_documents = [
-        ImageDocument(image=convert_PIL_to_base64(cv_image)) for cv_image in resume
-    ]
+def compute_image_hash(image) -> str:
+    """
+    Compute a SHA-256 digest of a rendered page's pixels. pdf2image renders are
+    deterministic, so any visible edit to the page (text, font, spacing or color)
+    changes the digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def _get_cached_critique(key) -> Optional[str]:
+    with _LAYOUT_CRITIQUE_CACHE_LOCK:
+        critique = _LAYOUT_CRITIQUE_CACHE.get(key)
+        if critique is not None:
+            _LAYOUT_CRITIQUE_CACHE.move_to_end(key)
+        return critique
+
+def _set_cached_critique(key, critique: str):
+    with _LAYOUT_CRITIQUE_CACHE_LOCK:
+        _LAYOUT_CRITIQUE_CACHE[key] = critique
+        _LAYOUT_CRITIQUE_CACHE.move_to_end(key)
+        while len(_LAYOUT_CRITIQUE_CACHE) > MAX_LAYOUT_CACHE_SIZE:
+            _LAYOUT_CRITIQUE_CACHE.popitem(last=False)
 
+def _build_layout_messages(
+    system_prompt: str,
+    images: List,
+    prompt: str,
+    job_description: Optional[str] = None,
+    image_detail: str = "high",
+) -> List[ChatMessage]:
     messages = [
-        ChatMessage(content=CV_LAYOUT_CRITIQUE_SYSTEM_PROMPT, role=MessageRole.SYSTEM)
+        ChatMessage(content=system_prompt, role=MessageRole.SYSTEM)
     ]
-    
+
     if job_description:
         messages.append(
             ChatMessage(content=f"# Job description:\n\n{job_description}", role=MessageRole.SYSTEM)
         )
-    
+
     messages.append(
         generate_openai_multi_modal_chat_message(
-            prompt = "resume",
+            prompt = prompt,
             role = "user",
-            image_documents=image_documents,
-            image_detail="high"
+            image_documents=[
+                ImageDocument(image=convert_PIL_to_base64(image)) for image in images
+            ],
+            image_detail=image_detail
             )
     )
+    return messages
+
+def critique_cv_layout(
+    resume,
+    llm: LLM,
+    job_description: Optional[str] = None,
+):
+    if not isinstance(resume, list):
+        resume = [resume]
+
+    messages = _build_layout_messages(
+        CV_LAYOUT_CRITIQUE_SYSTEM_PROMPT,
+        images=resume,
+        prompt="resume",
+        job_description=job_description,
+    )
     
     response = llm.chat(messages)
     return response.message.content
@@ -83,28 +163,106 @@ async def acritique_cv_layout(
 ):  
     if not isinstance(resume, list):
         resume = [resume]
-    
-    image_documents = [
-        ImageDocument(image=convert_PIL_to_base64(cv_image)) for cv_image in resume
-    ]
 
-    messages = [
-        ChatMessage(content=CV_LAYOUT_CRITIQUE_SYSTEM_PROMPT, role=MessageRole.SYSTEM)
-    ]
-    
-    if job_description:
-        messages.append(
-            ChatMessage(content=f"# Job description:\n\n{job_description}", role=MessageRole.SYSTEM)
-        )
-    
-    messages.append(
-        generate_openai_multi_modal_chat_message(
-            prompt = "resume",
-            role = "user",
-            image_documents=image_documents,
-            image_detail="high"
-            )
+    messages = _build_layout_messages(
+        CV_LAYOUT_CRITIQUE_SYSTEM_PROMPT,
+        images=resume,
+        prompt="resume",
+        job_description=job_description,
     )
     
     response = await llm.achat(messages)
-    return response.message.content
\ No newline at end of file
+    return response.message.content
+
+async def _acritique_cv_page_layout(
+    page,
+    page_hash: str,
+    llm: LLM,
+    job_description: Optional[str] = None,
+) -> str:
+    cache_key = ("page", page_hash, job_description or "", getattr(llm, "model", ""))
+    critique = _get_cached_critique(cache_key)
+    if critique is not None:
+        return critique
+
+    messages = _build_layout_messages(
+        CV_PAGE_LAYOUT_CRITIQUE_SYSTEM_PROMPT,
+        images=[page],
+        prompt="resume page",
+        job_description=job_description,
+    )
+    response = await llm.achat(messages)
+    critique = response.message.content
+    _set_cached_critique(cache_key, critique)
+    return critique
+
+async def _acritique_cv_length_layout(
+    resume: List,
+    page_hashes: List[str],
+    llm: LLM,
+    job_description: Optional[str] = None,
+) -> str:
+    cache_key = ("length", tuple(page_hashes), job_description or "", getattr(llm, "model", ""))
+    critique = _get_cached_critique(cache_key)
+    if critique is not None:
+        return critique
+
+    # Page breaks and cross-page consistency need legible text, length alone does not
+    is_multi_page = len(resume) > 1
+    system_prompt = CV_LENGTH_LAYOUT_CRITIQUE_SYSTEM_PROMPT.format(
+        multi_page_criteria=CV_MULTI_PAGE_CRITERIA if is_multi_page else ""
+    )
+    messages = _build_layout_messages(
+        system_prompt,
+        images=resume,
+        prompt="resume",
+        job_description=job_description,
+        image_detail="high" if is_multi_page else "low",
+    )
+    response = await llm.achat(messages)
+    critique = response.message.content
+    _set_cached_critique(cache_key, critique)
+    return critique
+
+async def acritique_cv_layout_by_page(
+    resume,
+    llm: LLM,
+    job_description: Optional[str] = None,
+) -> str:
+    """
+    Critique each page of the resume concurrently, followed by a short pass on
+    length, page breaks and cross-page consistency. Pages are keyed by a digest of their pixels so that
+    critiques of unchanged pages are reused on repeat analyses.
+    """
+    if not isinstance(resume, list):
+        resume = [resume]
+
+    page_hashes = [compute_image_hash(cv_image) for cv_image in resume]
+
+    tasks = [
+        _acritique_cv_page_layout(
+            page=cv_image,
+            page_hash=page_hash,
+            llm=llm,
+            job_description=job_description
+            )
+        for cv_image, page_hash in zip(resume, page_hashes)
+        ]
+    tasks.append(
+        _acritique_cv_length_layout(
+            resume=resume,
+            page_hashes=page_hashes,
+            llm=llm,
+            job_description=job_description
+            )
+        )
+
+    *page_critiques, length_critique = await asyncio.gather(*tasks)
+
+    sections = [
+        f"## Page {page_no}\n{critique}" for page_no, critique in enumerate(page_critiques, start=1)
+        ]
+    length_title = "Length, Page Breaks and Consistency" if len(resume) > 1 else "Length"
+    sections.append(f"## {length_title}\n{length_critique}")
+
+    return "\n\n".join(sections)
\ No newline at end of file
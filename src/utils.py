@@ -1,14 +1,164 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from llama_index.core import SimpleDirectoryReader
 from llama_index.core.schema import Document, MetadataMode
 from llama_index.core.prompts import ChatMessage, MessageRole
-from typing import List, Tuple
+from pdf2image import convert_from_path
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+FILE_DIGEST_CHUNK_SIZE = 1024 * 1024
+MAX_INGESTION_CACHE_BYTES = 256 * 1024 * 1024
+
+class _InFlightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into one in-flight computation.
+    Callers arriving while the computation is running wait for it and receive its
+    result (or a RuntimeError chained to its exception) instead of repeating the work.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                # A fresh error per waiter, so the shared exception's traceback is not extended by every thread
+                raise RuntimeError("Shared in-flight computation failed") from call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+_INGESTION_CACHE = OrderedDict()
+_INGESTION_CACHE_SIZES = {}
+_INGESTION_CACHE_LOCK = threading.Lock()
+_INGESTION_FLIGHT = SingleFlight()
+
+def compute_file_digest(
+    file_path: str
+) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(FILE_DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _estimate_ingestion_size(
+    value: Any
+) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    # Rendered pages: uncompressed PIL.Image buffers dominate memory usage
+    return sum(
+        image.width * image.height * len(image.getbands()) for image in value
+    )
+
+def _cached_ingest(
+    key: Hashable,
+    file_path: str,
+    loader: Callable[[str], Any]
+) -> Any:
+    with _INGESTION_CACHE_LOCK:
+        if key in _INGESTION_CACHE:
+            _INGESTION_CACHE.move_to_end(key)
+            return _INGESTION_CACHE[key]
+
+    def load():
+        with _INGESTION_CACHE_LOCK:
+            if key in _INGESTION_CACHE:
+                return _INGESTION_CACHE[key]
+        result = loader(file_path)
+        size = _estimate_ingestion_size(result)
+        if size > MAX_INGESTION_CACHE_BYTES:
+            return result
+        with _INGESTION_CACHE_LOCK:
+            _INGESTION_CACHE[key] = result
+            _INGESTION_CACHE_SIZES[key] = size
+            while sum(_INGESTION_CACHE_SIZES.values()) > MAX_INGESTION_CACHE_BYTES:
+                evicted_key, _ = _INGESTION_CACHE.popitem(last=False)
+                del _INGESTION_CACHE_SIZES[evicted_key]
+        return result
+
+    return _INGESTION_FLIGHT.do(key, load)
+
+def load_document_text(
+    file_path: str,
+    file_digest: Optional[str] = None
+) -> str:
+    """
+    Parse a .pdf or .docx file into text. Results are cached by file content, and
+    concurrent requests for the same file share one parse.
+    """
+    file_digest = file_digest or compute_file_digest(file_path)
+    return _cached_ingest(
+        ("text", file_digest),
+        file_path,
+        lambda path: combine_documents(
+            SimpleDirectoryReader(input_files = [path]).load_data()
+            )
+    )
+
+def _render_document_images(
+    dpi: int
+) -> Callable[[str], List]:
+    def render(path: str) -> List:
+        # pdf2image returns lazily decoded images. Decode them here, before they are cached
+        # and shared across threads, and drop the encoded buffer each one keeps.
+        decoded_images = []
+        for image in convert_from_path(path, dpi=dpi):
+            decoded_images.append(image.copy())
+            image.close()
+        return decoded_images
+    return render
+
+def load_document_images(
+    file_path: str,
+    dpi: int = 300,
+    file_digest: Optional[str] = None
+) -> List:
+    """
+    Render each page of a .pdf file into a PIL.Image. Results are cached by file
+    content and dpi, and concurrent requests for the same file share one render.
+    The returned images are shared with other sessions and must not be mutated.
+    """
+    file_digest = file_digest or compute_file_digest(file_path)
+    images = _cached_ingest(
+        ("images", file_digest, dpi),
+        file_path,
+        _render_document_images(dpi)
+    )
+    return list(images)
 
 def combine_documents(
-    pages: Document
+    pages: List[Document]
 ) -> str:
-    combined_page_content = ""
-    for page in pages:
-        combined_page_content += page.get_content(metadata_mode = MetadataMode.LLM)
-    return combined_page_content
+    return "".join(
+        page.get_content(metadata_mode = MetadataMode.LLM) for page in pages
+    )
 
 def convert_llamaindex_messages_to_gradio(
     li_messages: List[ChatMessage]